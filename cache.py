@@ -0,0 +1,159 @@
+"""
+Cache module for Redis-backed workflow caching.
+Caching is enabled only when the REDIS_URL environment variable is set.
+Redis operations use short socket timeouts, so an unavailable or stalled
+Redis is treated as a cache miss and requests fall back to the database.
+"""
+
+import os
+from functools import lru_cache
+from typing import Optional
+import orjson
+from redis.asyncio import Redis
+
+# Time-to-live for cached workflow definitions, in seconds
+WORKFLOW_CACHE_TTL = int(os.getenv("WORKFLOW_CACHE_TTL", "300"))
+
+# Time-to-live for workflow cache versions, in seconds. It must outlive every
+# view cached under a version, so a version only resets to 0 once no view of
+# the workflow remains in the cache.
+WORKFLOW_VERSION_TTL = WORKFLOW_CACHE_TTL * 10
+
+# Timeouts for connecting to and waiting on Redis, in seconds
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.25"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+
+
+# Cached representations of a workflow: the complete workflow and its execution plan
+WORKFLOW_VIEWS = ("complete", "plan")
+
+
+def _version_key(workflow_id: str) -> str:
+    return f"wf:{workflow_id}:ver"
+
+
+def _workflow_key(workflow_id: str, version: int, view: str) -> str:
+    return f"wf:{workflow_id}:{view}:v{version}"
+
+
+@lru_cache(maxsize=1)
+def get_redis_client() -> Optional[Redis]:
+    """
+    Create and return a Redis client using the REDIS_URL environment variable.
+    
+    Returns:
+        Optional[Redis]: Redis client, or None if caching is disabled
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        return None
+    return Redis.from_url(
+        redis_url,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT
+    )
+
+
+async def close_redis_client() -> None:
+    """
+    Close the Redis client's connection pool, if one was created.
+    """
+    redis = get_redis_client()
+    if redis is not None:
+        await redis.aclose()
+
+
+async def get_workflow_version(workflow_id: str) -> Optional[int]:
+    """
+    Get the current cache version of a workflow.
+    
+    Read the version before fetching the workflow from the database and pass it
+    to cache_workflow, so data fetched before a mutation is never cached under
+    the version that follows it.
+    
+    Args:
+        workflow_id (str): ID of the workflow
+    
+    Returns:
+        Optional[int]: The cache version, or None if caching is disabled or unavailable
+    """
+    redis = get_redis_client()
+    if redis is None:
+        return None
+    
+    try:
+        version = await redis.get(_version_key(workflow_id))
+    except Exception:
+        # Skip caching while the cache is unavailable
+        return None
+    
+    return int(version) if version is not None else 0
+
+
+async def get_cached_workflow(workflow_id: str, version: Optional[int], view: str = "complete") -> Optional[dict]:
+    """
+    Get a cached workflow with its fields and prompts.
+    
+    Args:
+        workflow_id (str): ID of the workflow
+        version (Optional[int]): Cache version from get_workflow_version
+        view (str): Cached representation to get, one of WORKFLOW_VIEWS
+    
+    Returns:
+        Optional[dict]: The cached workflow, or None on a cache miss or error
+    """
+    redis = get_redis_client()
+    if redis is None or version is None:
+        return None
+    
+    try:
+        cached = await redis.get(_workflow_key(workflow_id, version, view))
+    except Exception:
+        # Treat an unavailable cache as a miss
+        return None
+    
+    return orjson.loads(cached) if cached is not None else None
+
+
+async def cache_workflow(workflow_id: str, version: Optional[int], workflow: dict, view: str = "complete") -> None:
+    """
+    Cache a workflow with its fields and prompts.
+    
+    Args:
+        workflow_id (str): ID of the workflow
+        version (Optional[int]): Cache version read before fetching the workflow
+        workflow (dict): Workflow data as returned by the database
+        view (str): Cached representation to store, one of WORKFLOW_VIEWS
+    """
+    redis = get_redis_client()
+    if redis is None or version is None:
+        return
+    
+    try:
+        await redis.set(_workflow_key(workflow_id, version, view), orjson.dumps(workflow), ex=WORKFLOW_CACHE_TTL)
+    except Exception:
+        pass
+
+
+async def invalidate_workflow(workflow_id: str) -> None:
+    """
+    Invalidate cached views of a workflow after its fields or prompts change.
+    
+    Bumping the version makes every previously cached view unreachable, including
+    views written late by readers that fetched the workflow before the change.
+    The version expires after WORKFLOW_VERSION_TTL without changes, so versions
+    of idle workflows do not accumulate in Redis.
+    
+    Args:
+        workflow_id (str): ID of the workflow
+    """
+    redis = get_redis_client()
+    if redis is None:
+        return
+    
+    try:
+        version_key = _version_key(workflow_id)
+        async with redis.pipeline(transaction=True) as pipe:
+            await pipe.incr(version_key).expire(version_key, WORKFLOW_VERSION_TTL).execute()
+    except Exception:
+        pass
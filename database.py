@@ -4,34 +4,110 @@ Uses environment variables loaded from .env file.
 """
 
 import os
+import asyncio
+from typing import Optional
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
+from supabase import AsyncClient, AsyncClientOptions
 
 # Load environment variables from .env file
 load_dotenv()
 
-def get_supabase_client() -> Client:
+# Connection pool limits for the HTTP client used by all PostgREST requests
+SUPABASE_POOL_LIMITS = httpx.Limits(
+    max_keepalive_connections=20,
+    max_connections=50,
+    keepalive_expiry=30
+)
+
+
+class PooledPostgrestClient(AsyncClient):
     """
-    Create and return a Supabase client using environment variables.
+    Async Supabase client whose PostgREST requests use a dedicated connection pool.
     
-    Returns:
-        Client: Initialized Supabase client
+    The pool is not passed as AsyncClientOptions.httpx_client: the PostgREST,
+    storage and functions clients each set the base URL of the HTTP client they
+    are given, so a shared client would send table and RPC requests to whichever
+    service was initialized last.
+    """
+    
+    def __init__(self, supabase_url: str, supabase_key: str, options: Optional[AsyncClientOptions] = None):
+        super().__init__(supabase_url, supabase_key, options)
+        
+        # Use a persistent HTTP/2 connection pool sized for concurrent requests
+        self.postgrest_http_client = httpx.AsyncClient(
+            limits=SUPABASE_POOL_LIMITS,
+            timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT,
+            follow_redirects=True,
+            http2=True
+        )
+    
+    @property
+    def postgrest(self) -> AsyncPostgrestClient:
+        if self._postgrest is None:
+            self._postgrest = self._init_postgrest_client(
+                rest_url=self.rest_url,
+                headers=self.options.headers,
+                schema=self.options.schema,
+                http_client=self.postgrest_http_client
+            )
         
+        return self._postgrest
+
+
+# Cached client instance and the lock guarding its creation
+_supabase_client: Optional[PooledPostgrestClient] = None
+_supabase_client_lock = asyncio.Lock()
+
+
+async def get_supabase_client() -> AsyncClient:
+    """
+    Create and return an async Supabase client using environment variables.
+    
+    The client is created once and cached, so repeated calls reuse the same
+    client and its PostgREST connection pool.
+    
+    Returns:
+        AsyncClient: Initialized Supabase client
+    
     Raises:
         ValueError: If required environment variables are missing
     """
-    # Get environment variables
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
+    global _supabase_client
     
-    # Validate required environment variables
-    if not supabase_url:
-        raise ValueError("SUPABASE_URL environment variable is required")
-    if not supabase_key:
-        raise ValueError("SUPABASE_SERVICE_KEY environment variable is required")
+    if _supabase_client is not None:
+        return _supabase_client
     
-    # Create and return Supabase client
-    return create_client(supabase_url, supabase_key)
+    async with _supabase_client_lock:
+        if _supabase_client is not None:
+            return _supabase_client
+        
+        # Get environment variables
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
+        
+        # Validate required environment variables
+        if not supabase_url:
+            raise ValueError("SUPABASE_URL environment variable is required")
+        if not supabase_key:
+            raise ValueError("SUPABASE_SERVICE_KEY environment variable is required")
+        
+        # Create and cache Supabase client
+        _supabase_client = await PooledPostgrestClient.create(supabase_url, supabase_key)
+        return _supabase_client
+
 
-# Create a global client instance
-supabase: Client = get_supabase_client()
+async def close_supabase_client() -> None:
+    """
+    Close the cached Supabase client's PostgREST connection pool, if one was created.
+    """
+    global _supabase_client
+    
+    if _supabase_client is None:
+        return
+    
+    http_client = _supabase_client.postgrest_http_client
+    _supabase_client = None
+    await http_client.aclose()
@@ -48,8 +48,10 @@ CREATE INDEX idx_workflows_created_at ON workflows(created_at);
 -- Index on workflows.name for name-based searches
 CREATE INDEX idx_workflows_name ON workflows(name);
 
--- Index on fields.workflow_id for efficient joins
-CREATE INDEX idx_fields_workflow_id ON fields(workflow_id);
+-- Index on fields.workflow_id for efficient joins, ordered by creation time
+-- (see "Upgrading an Existing Database" in README.md to rebuild the single-column
+-- idx_fields_workflow_id and idx_prompts_field_id of earlier schemas)
+CREATE INDEX idx_fields_workflow_id ON fields(workflow_id, created_at);
 
 -- Index on fields.data_type for filtering by data type
 CREATE INDEX idx_fields_data_type ON fields(data_type);
@@ -57,8 +59,9 @@ CREATE INDEX idx_fields_data_type ON fields(data_type);
 -- Index on fields.name for name-based searches
 CREATE INDEX idx_fields_name ON fields(name);
 
--- Index on prompts.field_id for efficient joins
-CREATE INDEX idx_prompts_field_id ON prompts(field_id);
+-- Index on prompts.field_id for efficient joins, ordered by creation time
+-- so the first prompt of each field is read straight from the index
+CREATE INDEX idx_prompts_field_id ON prompts(field_id, created_at);
 
 -- Index on prompts.created_at for time-based queries
 CREATE INDEX idx_prompts_created_at ON prompts(created_at);
@@ -111,3 +114,128 @@ COMMENT ON COLUMN fields.data_type IS 'Type of data this field expects (text, nu
 COMMENT ON COLUMN prompts.id IS 'Unique identifier for the prompt';
 COMMENT ON COLUMN prompts.field_id IS 'Reference to the field this prompt is for';
 COMMENT ON COLUMN prompts.prompt_template IS 'Template text for the AI prompt';
+
+-- Stored procedures called through Supabase RPC
+
+-- Create a field and its prompt in a single transaction.
+-- Returns no rows if the workflow does not exist.
+CREATE OR REPLACE FUNCTION create_field_with_prompt(
+    p_workflow_id UUID,
+    p_field_id UUID,
+    p_name TEXT,
+    p_data_type TEXT,
+    p_prompt_template TEXT
+)
+RETURNS SETOF JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_field fields;
+    new_prompt prompts;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM workflows WHERE id = p_workflow_id) THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO fields (id, workflow_id, name, data_type)
+    VALUES (p_field_id, p_workflow_id, p_name, p_data_type)
+    RETURNING * INTO new_field;
+
+    INSERT INTO prompts (field_id, prompt_template)
+    VALUES (new_field.id, p_prompt_template)
+    RETURNING * INTO new_prompt;
+
+    RETURN NEXT json_build_object(
+        'id', new_field.id,
+        'workflow_id', new_field.workflow_id,
+        'name', new_field.name,
+        'data_type', new_field.data_type,
+        'created_at', new_field.created_at,
+        'prompts', json_build_array(json_build_object(
+            'id', new_prompt.id,
+            'field_id', new_prompt.field_id,
+            'prompt_template', new_prompt.prompt_template,
+            'created_at', new_prompt.created_at
+        ))
+    );
+END;
+$$;
+
+-- Get a workflow with all its fields and their prompts as nested JSON.
+-- Returns no rows if the workflow does not exist.
+CREATE OR REPLACE FUNCTION get_workflow_complete(p_workflow_id UUID)
+RETURNS SETOF JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'id', w.id,
+        'name', w.name,
+        'created_at', w.created_at,
+        'fields', COALESCE((
+            SELECT json_agg(
+                json_build_object(
+                    'id', f.id,
+                    'workflow_id', f.workflow_id,
+                    'name', f.name,
+                    'data_type', f.data_type,
+                    'created_at', f.created_at,
+                    'prompts', COALESCE((
+                        SELECT json_agg(
+                            json_build_object(
+                                'id', p.id,
+                                'field_id', p.field_id,
+                                'prompt_template', p.prompt_template,
+                                'created_at', p.created_at
+                            )
+                            ORDER BY p.created_at
+                        )
+                        FROM prompts p
+                        WHERE p.field_id = f.id
+                    ), '[]'::json)
+                )
+                ORDER BY f.created_at
+            )
+            FROM fields f
+            WHERE f.workflow_id = w.id
+        ), '[]'::json)
+    )
+    FROM workflows w
+    WHERE w.id = p_workflow_id;
+$$;
+
+-- Get the execution plan of a workflow: each field with the template of its first prompt.
+-- prompt_template is null for fields without prompts.
+-- Returns no rows if the workflow does not exist.
+CREATE OR REPLACE FUNCTION get_execution_plan(p_workflow_id UUID)
+RETURNS SETOF JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'id', w.id,
+        'name', w.name,
+        'fields', COALESCE((
+            SELECT json_agg(
+                json_build_object(
+                    'id', f.id,
+                    'name', f.name,
+                    'data_type', f.data_type,
+                    'prompt_template', first_prompt.prompt_template
+                )
+                ORDER BY f.created_at
+            )
+            FROM fields f
+            LEFT JOIN LATERAL (
+                SELECT p.prompt_template
+                FROM prompts p
+                WHERE p.field_id = f.id
+                ORDER BY p.created_at
+                LIMIT 1
+            ) first_prompt ON TRUE
+            WHERE f.workflow_id = w.id
+        ), '[]'::json)
+    )
+    FROM workflows w
+    WHERE w.id = p_workflow_id;
+$$;
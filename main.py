@@ -2,41 +2,174 @@
 FastAPI application with CRUD endpoints for workflows, fields, and prompts.
 """
 
-from fastapi import FastAPI, HTTPException, status
-from fastapi.responses import JSONResponse
-from typing import List
-import uuid
-from datetime import datetime
+from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import asyncio
+import os
+from uuid import UUID
+from datetime import datetime, timezone
 
-from database import supabase
+from postgrest.exceptions import APIError
+from supabase import AsyncClient
+
+from database import get_supabase_client, close_supabase_client
 from models import (
     WorkflowCreate, Workflow, WorkflowComplete,
     FieldCreate, FieldSchema, FieldWithPrompts,
-    PromptCreate, Prompt,
-    WorkflowExecutionRequest, WorkflowExecutionResponse, FieldExecutionResult
+    PromptCreate,
+    WorkflowExecutionRequest, WorkflowExecutionResponse, WorkflowExecutionSummary,
+    FieldExecutionResult
+)
+from services import execute_prompt, execute_prompts_batched, MAX_PROMPTS_PER_BATCH
+from cache import (
+    get_workflow_version, get_cached_workflow, cache_workflow, invalidate_workflow, close_redis_client
 )
-from services import execute_prompt
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the Supabase client on startup and release connections on shutdown.
+    """
+    await get_supabase_client()
+    yield
+    await close_supabase_client()
+    await close_redis_client()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="AI Configurable MVP API",
     description="API for managing workflows, fields, and prompts",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Maximum number of field prompts executed concurrently within a single workflow run
+MAX_CONCURRENT_PROMPTS = int(os.getenv("MAX_CONCURRENT_PROMPTS", "5"))
+
+# Postgres SQLSTATE raised when a unique constraint is violated
+UNIQUE_VIOLATION = "23505"
+
+# Unique constraint on field names within a workflow (see database_schema.sql)
+FIELD_NAME_CONSTRAINT = "uq_fields_name_per_workflow"
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+async def fetch_workflow_complete(supabase: AsyncClient, workflow_id: UUID) -> Optional[dict]:
+    """
+    Get a workflow with all its fields and prompts, using the cache when possible.
+    
+    Returns:
+        Optional[dict]: The workflow data, or None if the workflow does not exist
+    """
+    cache_version = await get_workflow_version(str(workflow_id))
+    workflow = await get_cached_workflow(str(workflow_id), cache_version)
+    if workflow is not None:
+        return workflow
+    
+    workflow_result = await supabase.rpc(
+        "get_workflow_complete", {"p_workflow_id": str(workflow_id)}
+    ).execute()
+    
+    if not workflow_result.data:
+        return None
+    
+    workflow = workflow_result.data[0]
+    await cache_workflow(str(workflow_id), cache_version, workflow)
+    return workflow
+
+
+async def fetch_execution_plan(supabase: AsyncClient, workflow_id: UUID) -> dict:
+    """
+    Get the execution plan of a workflow: each field with the template of its first prompt.
+    
+    Raises:
+        HTTPException: If the workflow does not exist or has no fields
+    """
+    cache_version = await get_workflow_version(str(workflow_id))
+    plan = await get_cached_workflow(str(workflow_id), cache_version, view="plan")
+    
+    if plan is None:
+        plan_result = await supabase.rpc(
+            "get_execution_plan", {"p_workflow_id": str(workflow_id)}
+        ).execute()
+        
+        if not plan_result.data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Workflow not found"
+            )
+        
+        plan = plan_result.data[0]
+        await cache_workflow(str(workflow_id), cache_version, plan, view="plan")
+    
+    if not plan["fields"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No fields found for this workflow"
+        )
+    
+    return plan
+
+
+def build_field_result(field: dict, result) -> FieldExecutionResult:
+    """
+    Build the execution result of a planned field from the AI response or error.
+    """
+    if field["prompt_template"] is None:
+        # Field has no prompts
+        return FieldExecutionResult(
+            field_id=field["id"],
+            field_name=field["name"],
+            data_type=field["data_type"],
+            prompt_template="",
+            ai_response="",
+            execution_success=False,
+            error_message="No prompts found for this field"
+        )
+    
+    if isinstance(result, Exception):
+        # Handle prompt execution errors
+        return FieldExecutionResult(
+            field_id=field["id"],
+            field_name=field["name"],
+            data_type=field["data_type"],
+            prompt_template=field["prompt_template"],
+            ai_response="",
+            execution_success=False,
+            error_message=str(result)
+        )
+    
+    return FieldExecutionResult(
+        field_id=field["id"],
+        field_name=field["name"],
+        data_type=field["data_type"],
+        prompt_template=field["prompt_template"],
+        ai_response=result,
+        execution_success=True,
+        error_message=None
+    )
+
 
 # =============================================================================
 # WORKFLOW ENDPOINTS
 # =============================================================================
 
 @app.post("/workflows/", response_model=Workflow, status_code=status.HTTP_201_CREATED)
-async def create_workflow(workflow_data: WorkflowCreate):
+async def create_workflow(workflow_data: WorkflowCreate, supabase: AsyncClient = Depends(get_supabase_client)):
     """
     Create a new workflow.
     """
     try:
         # Insert workflow into database
-        result = supabase.table("workflows").insert({
+        result = await supabase.table("workflows").insert({
             "name": workflow_data.name
         }).execute()
         
@@ -46,15 +179,13 @@ async def create_workflow(workflow_data: WorkflowCreate):
                 detail="Failed to create workflow"
             )
         
-        workflow = result.data[0]
-        return Workflow(
-            id=workflow["id"],
-            name=workflow["name"],
-            created_at=workflow["created_at"]
-        )
+        # Database rows are trusted; the response model validates them once
+        return result.data[0]
         
-    except Exception as e:
-        if "duplicate key value" in str(e).lower():
+    except HTTPException:
+        raise
+    except APIError as e:
+        if e.code == UNIQUE_VIOLATION:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="A workflow with this name already exists"
@@ -63,68 +194,30 @@ async def create_workflow(workflow_data: WorkflowCreate):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Database error: {str(e)}"
         )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}"
+        )
 
 
 @app.get("/workflows/{workflow_id}", response_model=WorkflowComplete)
-async def get_workflow(workflow_id: str):
+async def get_workflow(workflow_id: UUID, supabase: AsyncClient = Depends(get_supabase_client)):
     """
     Get a workflow with all its fields and their prompts.
     """
     try:
-        # Validate UUID format
-        try:
-            workflow_uuid = uuid.UUID(workflow_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid workflow ID format"
-            )
-        
-        # Get workflow
-        workflow_result = supabase.table("workflows").select("*").eq("id", str(workflow_uuid)).execute()
+        # Get workflow with its fields and prompts
+        workflow = await fetch_workflow_complete(supabase, workflow_id)
         
-        if not workflow_result.data:
+        if workflow is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Workflow not found"
             )
         
-        workflow = workflow_result.data[0]
-        
-        # Get fields for this workflow
-        fields_result = supabase.table("fields").select("*").eq("workflow_id", str(workflow_uuid)).execute()
-        fields = []
-        
-        for field_data in fields_result.data:
-            # Get prompts for each field
-            prompts_result = supabase.table("prompts").select("*").eq("field_id", field_data["id"]).execute()
-            
-            prompts = [
-                Prompt(
-                    id=prompt["id"],
-                    field_id=prompt["field_id"],
-                    prompt_template=prompt["prompt_template"],
-                    created_at=prompt["created_at"]
-                )
-                for prompt in prompts_result.data
-            ]
-            
-            field = FieldWithPrompts(
-                id=field_data["id"],
-                workflow_id=field_data["workflow_id"],
-                name=field_data["name"],
-                data_type=field_data["data_type"],
-                created_at=field_data["created_at"],
-                prompts=prompts
-            )
-            fields.append(field)
-        
-        return WorkflowComplete(
-            id=workflow["id"],
-            name=workflow["name"],
-            created_at=workflow["created_at"],
-            fields=fields
-        )
+        # Database rows are trusted; the response model validates them once
+        return workflow
         
     except HTTPException:
         raise
@@ -140,102 +233,67 @@ async def get_workflow(workflow_id: str):
 # =============================================================================
 
 @app.post("/workflows/{workflow_id}/fields", response_model=FieldWithPrompts, status_code=status.HTTP_201_CREATED)
-async def create_field_with_prompt(workflow_id: str, field_data: FieldCreate, prompt_data: PromptCreate):
+async def create_field_with_prompt(
+    workflow_id: UUID,
+    field_data: FieldCreate,
+    prompt_data: PromptCreate,
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
     """
     Add a new field and its prompt to a workflow.
     """
     try:
-        # Validate UUID format
-        try:
-            workflow_uuid = uuid.UUID(workflow_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid workflow ID format"
-            )
-        
-        # Verify workflow exists
-        workflow_result = supabase.table("workflows").select("id").eq("id", str(workflow_uuid)).execute()
-        if not workflow_result.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Workflow not found"
-            )
-        
         # Validate that field_data.workflow_id matches the URL parameter
-        if field_data.workflow_id != workflow_uuid:
+        if field_data.workflow_id != workflow_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Field workflow_id must match the URL workflow_id"
             )
         
-        # Create field
-        field_result = supabase.table("fields").insert({
-            "workflow_id": str(workflow_uuid),
-            "name": field_data.name,
-            "data_type": field_data.data_type
+        # Create field (using prompt_data.field_id as its ID) and prompt in one transaction
+        field_result = await supabase.rpc("create_field_with_prompt", {
+            "p_workflow_id": str(workflow_id),
+            "p_field_id": str(prompt_data.field_id),
+            "p_name": field_data.name,
+            "p_data_type": field_data.data_type,
+            "p_prompt_template": prompt_data.prompt_template
         }).execute()
         
         if not field_result.data:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to create field"
-            )
-        
-        field = field_result.data[0]
-        field_id = field["id"]
-        
-        # Validate that prompt_data.field_id matches the created field
-        if prompt_data.field_id != uuid.UUID(field_id):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Prompt field_id must match the created field ID"
-            )
-        
-        # Create prompt
-        prompt_result = supabase.table("prompts").insert({
-            "field_id": field_id,
-            "prompt_template": prompt_data.prompt_template
-        }).execute()
-        
-        if not prompt_result.data:
-            # If prompt creation fails, clean up the field
-            supabase.table("fields").delete().eq("id", field_id).execute()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to create prompt"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Workflow not found"
             )
         
-        prompt = prompt_result.data[0]
+        # The cached workflow no longer reflects its fields
+        await invalidate_workflow(str(workflow_id))
         
-        return FieldWithPrompts(
-            id=field["id"],
-            workflow_id=field["workflow_id"],
-            name=field["name"],
-            data_type=field["data_type"],
-            created_at=field["created_at"],
-            prompts=[
-                Prompt(
-                    id=prompt["id"],
-                    field_id=prompt["field_id"],
-                    prompt_template=prompt["prompt_template"],
-                    created_at=prompt["created_at"]
-                )
-            ]
-        )
+        # Database rows are trusted; the response model validates them once
+        return field_result.data[0]
         
     except HTTPException:
         raise
-    except Exception as e:
-        if "duplicate key value" in str(e).lower():
+    except APIError as e:
+        if e.code == UNIQUE_VIOLATION:
+            if FIELD_NAME_CONSTRAINT in (e.message or ""):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A field with this name already exists in this workflow"
+                )
+            # The only other unique key is the client-supplied field ID
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
-                detail="A field with this name already exists in this workflow"
+                detail="Field ID already exists"
             )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Database error: {str(e)}"
         )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}"
+        )
 
 
 # =============================================================================
@@ -243,100 +301,63 @@ async def create_field_with_prompt(workflow_id: str, field_data: FieldCreate, pr
 # =============================================================================
 
 @app.post("/workflows/{workflow_id}/execute", response_model=WorkflowExecutionResponse)
-async def execute_workflow(workflow_id: str, execution_request: WorkflowExecutionRequest):
+async def execute_workflow(
+    workflow_id: UUID,
+    execution_request: WorkflowExecutionRequest,
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
     """
     Execute a workflow by running all field prompts with the provided user input.
     """
     try:
-        # Validate UUID format
-        try:
-            workflow_uuid = uuid.UUID(workflow_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid workflow ID format"
-            )
-        
-        # Get workflow with all fields and prompts
-        workflow_result = supabase.table("workflows").select("*").eq("id", str(workflow_uuid)).execute()
-        
-        if not workflow_result.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Workflow not found"
-            )
-        
-        workflow = workflow_result.data[0]
+        # Get each field of the workflow with the template of its first prompt
+        workflow = await fetch_execution_plan(supabase, workflow_id)
+        fields = workflow["fields"]
         
-        # Get all fields for this workflow
-        fields_result = supabase.table("fields").select("*").eq("workflow_id", str(workflow_uuid)).execute()
+        executable_fields = [field for field in fields if field["prompt_template"] is not None]
+        prompt_templates = [field["prompt_template"] for field in executable_fields]
         
-        if not fields_result.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No fields found for this workflow"
+        if execution_request.batch and prompt_templates:
+            # Execute field prompts in as few OpenAI requests as fit the token limit
+            batches = [
+                prompt_templates[start:start + MAX_PROMPTS_PER_BATCH]
+                for start in range(0, len(prompt_templates), MAX_PROMPTS_PER_BATCH)
+            ]
+            batch_results = await asyncio.gather(
+                *(
+                    execute_prompts_batched(prompt_templates=batch, user_input=execution_request.user_input)
+                    for batch in batches
+                ),
+                return_exceptions=True
             )
-        
-        fields = fields_result.data
-        field_results = []
-        successful_executions = 0
-        failed_executions = 0
-        
-        # Process each field asynchronously
-        for field in fields:
-            # Get prompts for this field
-            prompts_result = supabase.table("prompts").select("*").eq("field_id", field["id"]).execute()
             
-            if not prompts_result.data:
-                # Field has no prompts
-                field_result = FieldExecutionResult(
-                    field_id=field["id"],
-                    field_name=field["name"],
-                    data_type=field["data_type"],
-                    prompt_template="",
-                    ai_response="",
-                    execution_success=False,
-                    error_message="No prompts found for this field"
-                )
-                field_results.append(field_result)
-                failed_executions += 1
-                continue
+            # A failed batch only fails the fields it contains
+            results = []
+            for batch, batch_result in zip(batches, batch_results):
+                if isinstance(batch_result, Exception):
+                    results.extend([batch_result] * len(batch))
+                else:
+                    results.extend(batch_result)
+        else:
+            # Execute all field prompts concurrently, bounded to avoid OpenAI rate limits
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROMPTS)
             
-            # Use the first prompt (assuming one prompt per field for now)
-            prompt = prompts_result.data[0]
+            async def run_prompt(prompt_template: str) -> str:
+                async with semaphore:
+                    return await execute_prompt(
+                        prompt_template=prompt_template,
+                        user_input=execution_request.user_input
+                    )
             
-            try:
-                # Execute the prompt asynchronously
-                ai_response = await execute_prompt(
-                    prompt_template=prompt["prompt_template"],
-                    user_input=execution_request.user_input
-                )
-                
-                field_result = FieldExecutionResult(
-                    field_id=field["id"],
-                    field_name=field["name"],
-                    data_type=field["data_type"],
-                    prompt_template=prompt["prompt_template"],
-                    ai_response=ai_response,
-                    execution_success=True,
-                    error_message=None
-                )
-                field_results.append(field_result)
-                successful_executions += 1
-                
-            except Exception as e:
-                # Handle prompt execution errors
-                field_result = FieldExecutionResult(
-                    field_id=field["id"],
-                    field_name=field["name"],
-                    data_type=field["data_type"],
-                    prompt_template=prompt["prompt_template"],
-                    ai_response="",
-                    execution_success=False,
-                    error_message=str(e)
-                )
-                field_results.append(field_result)
-                failed_executions += 1
+            results = await asyncio.gather(
+                *(run_prompt(prompt_template) for prompt_template in prompt_templates),
+                return_exceptions=True
+            )
+        results_by_field = {field["id"]: result for field, result in zip(executable_fields, results)}
+        
+        field_results = [build_field_result(field, results_by_field.get(field["id"])) for field in fields]
+        successful_executions = sum(field_result.execution_success for field_result in field_results)
+        failed_executions = len(field_results) - successful_executions
         
         # Create response
         response = WorkflowExecutionResponse(
@@ -347,7 +368,7 @@ async def execute_workflow(workflow_id: str, execution_request: WorkflowExecutio
             successful_executions=successful_executions,
             failed_executions=failed_executions,
             field_results=field_results,
-            execution_timestamp=datetime.utcnow()
+            execution_timestamp=datetime.now(timezone.utc)
         )
         
         return response
@@ -361,21 +382,89 @@ async def execute_workflow(workflow_id: str, execution_request: WorkflowExecutio
         )
 
 
+@app.post("/workflows/{workflow_id}/execute/stream")
+async def execute_workflow_stream(
+    workflow_id: UUID,
+    execution_request: WorkflowExecutionRequest,
+    supabase: AsyncClient = Depends(get_supabase_client)
+):
+    """
+    Execute a workflow, streaming each field result as newline-delimited JSON as soon as it completes.
+    
+    The final line is the execution summary.
+    """
+    try:
+        # Get each field of the workflow with the template of its first prompt
+        workflow = await fetch_execution_plan(supabase, workflow_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected error during workflow execution: {str(e)}"
+        )
+    
+    fields = workflow["fields"]
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROMPTS)
+    
+    async def run_field(field: dict) -> FieldExecutionResult:
+        result = None
+        
+        if field["prompt_template"] is not None:
+            try:
+                async with semaphore:
+                    result = await execute_prompt(
+                        prompt_template=field["prompt_template"],
+                        user_input=execution_request.user_input
+                    )
+            except Exception as e:
+                result = e
+        
+        return build_field_result(field, result)
+    
+    async def stream_results():
+        tasks = [asyncio.create_task(run_field(field)) for field in fields]
+        successful_executions = 0
+        
+        try:
+            for completed in asyncio.as_completed(tasks):
+                field_result = await completed
+                successful_executions += field_result.execution_success
+                yield field_result.model_dump_json() + "\n"
+        finally:
+            # Stop outstanding prompts if the client disconnects
+            for task in tasks:
+                task.cancel()
+        
+        summary = WorkflowExecutionSummary(
+            workflow_id=workflow["id"],
+            workflow_name=workflow["name"],
+            user_input=execution_request.user_input,
+            total_fields=len(fields),
+            successful_executions=successful_executions,
+            failed_executions=len(fields) - successful_executions,
+            execution_timestamp=datetime.now(timezone.utc)
+        )
+        yield summary.model_dump_json() + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
 # =============================================================================
 # HEALTH CHECK ENDPOINT
 # =============================================================================
 
 @app.get("/health")
-async def health_check():
+async def health_check(supabase: AsyncClient = Depends(get_supabase_client)):
     """
     Health check endpoint.
     """
     try:
         # Test database connection
-        supabase.table("workflows").select("id").limit(1).execute()
+        await supabase.table("workflows").select("id").limit(1).execute()
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             content={"status": "unhealthy", "database": "disconnected", "error": str(e)}
         )
@@ -398,6 +487,7 @@ async def root():
             "workflow_detail": "/workflows/{workflow_id}",
             "add_field": "/workflows/{workflow_id}/fields",
             "execute_workflow": "/workflows/{workflow_id}/execute",
+            "execute_workflow_stream": "/workflows/{workflow_id}/execute/stream",
             "health": "/health"
         }
     }
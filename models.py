@@ -4,9 +4,12 @@ Includes create models for POST requests and response models with IDs and timest
 """
 
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 from uuid import UUID
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+# Supported field data types
+DataType = Literal['text', 'number', 'boolean', 'date', 'email', 'url', 'json']
 
 
 # =============================================================================
@@ -17,7 +20,8 @@ class WorkflowCreate(BaseModel):
     """Model for creating a new workflow."""
     name: str = Field(..., min_length=1, description="Name of the workflow")
 
-    @validator('name')
+    @field_validator('name')
+    @classmethod
     def validate_name(cls, v):
         if not v.strip():
             raise ValueError('Workflow name cannot be empty')
@@ -28,28 +32,23 @@ class FieldCreate(BaseModel):
     """Model for creating a new field."""
     workflow_id: UUID = Field(..., description="ID of the parent workflow")
     name: str = Field(..., min_length=1, description="Name of the field")
-    data_type: str = Field(..., description="Type of data this field expects")
+    data_type: DataType = Field(..., description="Type of data this field expects")
 
-    @validator('name')
+    @field_validator('name')
+    @classmethod
     def validate_name(cls, v):
         if not v.strip():
             raise ValueError('Field name cannot be empty')
         return v.strip()
 
-    @validator('data_type')
-    def validate_data_type(cls, v):
-        valid_types = ['text', 'number', 'boolean', 'date', 'email', 'url', 'json']
-        if v not in valid_types:
-            raise ValueError(f'Data type must be one of: {", ".join(valid_types)}')
-        return v
-
 
 class PromptCreate(BaseModel):
     """Model for creating a new prompt."""
-    field_id: UUID = Field(..., description="ID of the parent field")
+    field_id: UUID = Field(..., description="ID of the new field this prompt belongs to")
     prompt_template: str = Field(..., min_length=1, description="Template text for the AI prompt")
 
-    @validator('prompt_template')
+    @field_validator('prompt_template')
+    @classmethod
     def validate_prompt_template(cls, v):
         if not v.strip():
             raise ValueError('Prompt template cannot be empty')
@@ -67,8 +66,7 @@ class Prompt(BaseModel):
     prompt_template: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class FieldSchema(BaseModel):
@@ -80,8 +78,7 @@ class FieldSchema(BaseModel):
     created_at: datetime
     prompts: Optional[List[Prompt]] = None  # Optional nested prompts
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Workflow(BaseModel):
@@ -91,8 +88,7 @@ class Workflow(BaseModel):
     created_at: datetime
     fields: Optional[List[FieldSchema]] = None  # Optional nested fields
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # =============================================================================
@@ -103,7 +99,8 @@ class WorkflowUpdate(BaseModel):
     """Model for updating a workflow."""
     name: Optional[str] = Field(None, min_length=1, description="Updated name of the workflow")
 
-    @validator('name')
+    @field_validator('name')
+    @classmethod
     def validate_name(cls, v):
         if v is not None and not v.strip():
             raise ValueError('Workflow name cannot be empty')
@@ -113,28 +110,22 @@ class WorkflowUpdate(BaseModel):
 class FieldUpdate(BaseModel):
     """Model for updating a field."""
     name: Optional[str] = Field(None, min_length=1, description="Updated name of the field")
-    data_type: Optional[str] = Field(None, description="Updated data type")
+    data_type: Optional[DataType] = Field(None, description="Updated data type")
 
-    @validator('name')
+    @field_validator('name')
+    @classmethod
     def validate_name(cls, v):
         if v is not None and not v.strip():
             raise ValueError('Field name cannot be empty')
         return v.strip() if v else v
 
-    @validator('data_type')
-    def validate_data_type(cls, v):
-        if v is not None:
-            valid_types = ['text', 'number', 'boolean', 'date', 'email', 'url', 'json']
-            if v not in valid_types:
-                raise ValueError(f'Data type must be one of: {", ".join(valid_types)}')
-        return v
-
 
 class PromptUpdate(BaseModel):
     """Model for updating a prompt."""
     prompt_template: Optional[str] = Field(None, min_length=1, description="Updated prompt template")
 
-    @validator('prompt_template')
+    @field_validator('prompt_template')
+    @classmethod
     def validate_prompt_template(cls, v):
         if v is not None and not v.strip():
             raise ValueError('Prompt template cannot be empty')
@@ -167,8 +158,10 @@ class WorkflowComplete(Workflow):
 class WorkflowExecutionRequest(BaseModel):
     """Model for workflow execution requests."""
     user_input: str = Field(..., min_length=1, description="User input text to process")
+    batch: bool = Field(False, description="Combine field prompts into shared OpenAI requests")
 
-    @validator('user_input')
+    @field_validator('user_input')
+    @classmethod
     def validate_user_input(cls, v):
         if not v.strip():
             raise ValueError('User input cannot be empty')
@@ -196,3 +189,14 @@ class WorkflowExecutionResponse(BaseModel):
     failed_executions: int
     field_results: List[FieldExecutionResult]
     execution_timestamp: datetime
+
+
+class WorkflowExecutionSummary(BaseModel):
+    """Model for the final record of a streamed workflow execution."""
+    workflow_id: UUID
+    workflow_name: str
+    user_input: str
+    total_fields: int
+    successful_executions: int
+    failed_executions: int
+    execution_timestamp: datetime
@@ -5,122 +5,176 @@ Handles OpenAI API calls for prompt execution.
 
 import os
 import asyncio
-from typing import Optional
-import openai
+from functools import lru_cache
+from typing import List, Optional
+import orjson
+from dotenv import load_dotenv
 from openai import AsyncOpenAI
 
-# Initialize OpenAI client
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Load environment variables from .env file
+load_dotenv()
 
+# Validate API key once at startup
+if not os.getenv("OPENAI_API_KEY"):
+    raise ValueError("OPENAI_API_KEY environment variable is required")
 
-async def execute_prompt(prompt_template: str, user_input: str) -> str:
+# Initialize OpenAI client (rate-limited requests are retried with exponential backoff)
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+)
+
+# Limit the number of concurrent OpenAI requests across the process
+openai_semaphore = asyncio.Semaphore(int(os.getenv("OPENAI_MAX_CONCURRENCY", "20")))
+
+# Default system message, shared by every prompt execution
+DEFAULT_SYSTEM_MESSAGE = "You are a helpful AI assistant. Follow the instructions in the prompt carefully."
+DEFAULT_SYSTEM_MESSAGE_PARAM = {"role": "system", "content": DEFAULT_SYSTEM_MESSAGE}
+
+# Batched requests give every prompt the same token budget as a single execution,
+# within the model's output token limit
+PROMPT_MAX_TOKENS = 1000
+MODEL_MAX_OUTPUT_TOKENS = 4096
+MAX_PROMPTS_PER_BATCH = MODEL_MAX_OUTPUT_TOKENS // PROMPT_MAX_TOKENS
+
+
+@lru_cache(maxsize=1024)
+def build_prompt_prefix(prompt_template: str) -> str:
+    """
+    Build the part of the combined prompt that precedes the user input.
+    
+    Args:
+        prompt_template (str): The template for the AI prompt
+        
+    Returns:
+        str: The prompt template followed by the user input label
+    """
+    return prompt_template + "\n\nUser Input: "
+
+
+async def execute_prompt(
+    prompt_template: str,
+    user_input: str,
+    *,
+    model: str = "gpt-3.5-turbo",
+    max_tokens: int = PROMPT_MAX_TOKENS,
+    temperature: float = 0.7,
+    system_message: Optional[str] = None
+) -> str:
     """
     Execute a prompt using OpenAI's ChatGPT API.
     
     Args:
         prompt_template (str): The template for the AI prompt
         user_input (str): User input to be combined with the template
+        model (str): OpenAI model to use (default: gpt-3.5-turbo)
+        max_tokens (int): Maximum tokens in response (default: 1000)
+        temperature (float): Response randomness (0.0-2.0, default: 0.7)
+        system_message (Optional[str]): Custom system message
         
     Returns:
         str: The AI's response
         
     Raises:
-        ValueError: If required environment variables are missing
         openai.APIError: If the OpenAI API call fails
     """
-    # Validate API key
-    if not os.getenv("OPENAI_API_KEY"):
-        raise ValueError("OPENAI_API_KEY environment variable is required")
-    
     # Combine prompt template with user input
-    combined_prompt = f"{prompt_template}\n\nUser Input: {user_input}"
+    combined_prompt = build_prompt_prefix(prompt_template) + user_input
     
-    try:
-        # Make async call to OpenAI API
+    # Use custom system message or default
+    if system_message:
+        system_message_param = {"role": "system", "content": system_message}
+    else:
+        system_message_param = DEFAULT_SYSTEM_MESSAGE_PARAM
+    
+    # Make async call to OpenAI API
+    async with openai_semaphore:
         response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
+            model=model,
             messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful AI assistant. Follow the instructions in the prompt carefully."
-                },
+                system_message_param,
                 {
                     "role": "user",
                     "content": combined_prompt
                 }
             ],
-            max_tokens=1000,
-            temperature=0.7,
+            max_tokens=max_tokens,
+            temperature=temperature,
             timeout=30.0
         )
-        
-        # Extract and return the AI's response
-        return response.choices[0].message.content.strip()
-        
-    except openai.APIError as e:
-        raise openai.APIError(f"OpenAI API error: {str(e)}")
-    except Exception as e:
-        raise Exception(f"Unexpected error during prompt execution: {str(e)}")
+    
+    # Extract and return the AI's response
+    return response.choices[0].message.content.strip()
 
 
-async def execute_prompt_with_custom_params(
-    prompt_template: str, 
-    user_input: str,
-    model: str = "gpt-3.5-turbo",
-    max_tokens: int = 1000,
-    temperature: float = 0.7,
-    system_message: Optional[str] = None
-) -> str:
+async def execute_prompts_batched(prompt_templates: List[str], user_input: str) -> List[str]:
     """
-    Execute a prompt with custom parameters.
+    Execute several prompts against the same user input in a single OpenAI request.
+    
+    At most MAX_PROMPTS_PER_BATCH prompts fit in one request; split longer lists
+    into groups and call this function once per group.
     
     Args:
-        prompt_template (str): The template for the AI prompt
-        user_input (str): User input to be combined with the template
-        model (str): OpenAI model to use (default: gpt-3.5-turbo)
-        max_tokens (int): Maximum tokens in response (default: 1000)
-        temperature (float): Response randomness (0.0-2.0, default: 0.7)
-        system_message (Optional[str]): Custom system message
+        prompt_templates (List[str]): The templates for the AI prompts
+        user_input (str): User input to be combined with every template
         
     Returns:
-        str: The AI's response
+        List[str]: The AI's responses, in the same order as the templates
+        
+    Raises:
+        ValueError: If there are more than MAX_PROMPTS_PER_BATCH prompts or the
+            response does not contain an answer for every prompt
+        openai.APIError: If the OpenAI API call fails
     """
-    # Validate API key
-    if not os.getenv("OPENAI_API_KEY"):
-        raise ValueError("OPENAI_API_KEY environment variable is required")
+    if len(prompt_templates) > MAX_PROMPTS_PER_BATCH:
+        raise ValueError(f"At most {MAX_PROMPTS_PER_BATCH} prompts can be executed in one batch")
     
-    # Combine prompt template with user input
-    combined_prompt = f"{prompt_template}\n\nUser Input: {user_input}"
-    
-    # Use custom system message or default
-    system_content = system_message or "You are a helpful AI assistant. Follow the instructions in the prompt carefully."
+    # Combine numbered prompt templates with user input
+    tasks = "\n\n".join(
+        f"Task {index}:\n{prompt_template}"
+        for index, prompt_template in enumerate(prompt_templates, start=1)
+    )
+    combined_prompt = f"{tasks}\n\nUser Input: {user_input}"
     
-    try:
-        # Make async call to OpenAI API with custom parameters
+    # Make a single async call to OpenAI API, asking for one answer per task
+    async with openai_semaphore:
         response = await client.chat.completions.create(
-            model=model,
+            model="gpt-3.5-turbo",
             messages=[
                 {
                     "role": "system",
-                    "content": system_content
+                    "content": (
+                        "You are a helpful AI assistant. You will receive several numbered tasks "
+                        "that share the same user input. Follow the instructions of each task "
+                        "carefully and independently. Reply with a JSON object mapping each task "
+                        "number (as a string) to your response for that task."
+                    )
                 },
                 {
                     "role": "user",
                     "content": combined_prompt
                 }
             ],
-            max_tokens=max_tokens,
-            temperature=temperature,
+            max_tokens=PROMPT_MAX_TOKENS * len(prompt_templates),
+            temperature=0.7,
+            response_format={"type": "json_object"},
             timeout=30.0
         )
-        
-        # Extract and return the AI's response
-        return response.choices[0].message.content.strip()
-        
-    except openai.APIError as e:
-        raise openai.APIError(f"OpenAI API error: {str(e)}")
-    except Exception as e:
-        raise Exception(f"Unexpected error during prompt execution: {str(e)}")
+    
+    # Extract the AI's response for each task
+    try:
+        answers = orjson.loads(response.choices[0].message.content)
+    except orjson.JSONDecodeError:
+        raise ValueError("OpenAI response is not valid JSON")
+    
+    responses = []
+    for index in range(1, len(prompt_templates) + 1):
+        answer = answers.get(str(index)) if isinstance(answers, dict) else None
+        if answer is None:
+            raise ValueError(f"OpenAI response is missing an answer for task {index}")
+        responses.append(answer.strip() if isinstance(answer, str) else orjson.dumps(answer).decode())
+    
+    return responses
 
 
 async def test_openai_connection() -> bool:
@@ -131,9 +185,6 @@ async def test_openai_connection() -> bool:
         bool: True if connection is successful, False otherwise
     """
     try:
-        if not os.getenv("OPENAI_API_KEY"):
-            return False
-            
         # Make a simple test call
         response = await client.chat.completions.create(
             model="gpt-3.5-turbo",